@@ -1,6 +1,8 @@
 from datetime import datetime
 import requests
 import logging
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 import os
@@ -9,16 +11,44 @@ from dotenv import load_dotenv
  # Import OpenAI at the top of the file if not already imported
 from openai import OpenAI
 
+from llm_cache import DiskCache, SemanticCache
+
 # Add OpenAI client setup after the existing API key setup
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 if not openai_api_key:
     raise EnvironmentError("OPENAI_API_KEY not set")
 client = OpenAI(api_key=openai_api_key)
+llm_cache = SemanticCache(client)
 
 session = requests.Session()
 logger = logging.getLogger(__name__)
 
+# USASpending data refreshes daily; an hour keeps reruns and retries off the network
+award_cache = DiskCache("usaspending_awards", ttl=60 * 60)
+
+# Pages of awards pulled per analysis, and how many of them may be in flight at once
+MAX_PAGES = 5
+MAX_CONCURRENT_PAGES = 8
+# Award records included in the LLM prompt, and how much of each description is kept
+MAX_AWARD_RECORDS = 50
+MAX_DESCRIPTION_CHARS = 200
+# Upper bound on award data sent to the LLM (~30K tokens), well inside gpt-4o's context
+MAX_CONTEXT_CHARS = 120_000
+
+# Kept identical across calls so the spending analysis prompt shares a cacheable prefix
+USASPENDING_ANALYSIS_INSTRUCTIONS = """
+Analyze the USA spending data provided for the agency and bureau named by the user.
+
+Please provide:
+1. Key spending patterns and trends
+2. Notable contractors and award sizes
+3. Main categories of spending
+
+DO NOT NOTE:
+1. If there is a 0 or empty column, or anything that is a data error, DO NOT comment on it.
+"""
+
 @dataclass
 class ContractData:
     """Data structure for individual contract information."""
@@ -110,11 +140,20 @@ def search_awards_by_agency(agency_name: str, bureau_name: str, page: int = 1,
       ],
     }
 
+    cache_key = DiskCache.make_key(endpoint, payload)
+    cached = award_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        response = session.post(endpoint, json=payload, timeout=30)
+        response = session.post(endpoint, data=orjson.dumps(payload), timeout=30,
+                                headers={"Content-Type": "application/json"})
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        # orjson parses the raw bytes directly, skipping requests' text decode
+        data = orjson.loads(response.content)
+        award_cache.set(cache_key, data)
+        return data
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
         logger.error(f"USASpending API request failed: {e}")
         return {}
 
@@ -141,6 +180,61 @@ def search_awards_by_agency(agency_name: str, bureau_name: str, page: int = 1,
 
 # print(agency_data)
 
+def fetch_award_pages(agency_name: str, bureau_name: str, max_pages: int = MAX_PAGES) -> List[dict]:
+    """Fetch up to ``max_pages`` pages of awards for an agency/bureau.
+
+    Page 1 is requested first to learn whether more pages exist; pages
+    2..max_pages are then requested concurrently over the shared session.
+
+    Args:
+        agency_name: Name of the agency
+        bureau_name: Optional bureau/sub-agency name
+        max_pages: Maximum number of pages to fetch
+
+    Returns:
+        List of API responses, in page order
+    """
+    first_page = search_awards_by_agency(agency_name=agency_name, bureau_name=bureau_name, page=1)
+    if not first_page:
+        return []
+
+    pages = [first_page]
+    if max_pages < 2 or not first_page.get('page_metadata', {}).get('hasNext', False):
+        return pages
+
+    def fetch_page(page: int) -> dict:
+        return search_awards_by_agency(agency_name=agency_name, bureau_name=bureau_name, page=page)
+
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_PAGES, max_pages - 1)) as executor:
+        remaining = list(executor.map(fetch_page, range(2, max_pages + 1)))
+
+    # Keep pages up to the first failure or the last page the API reports
+    for agency_data in remaining:
+        if not agency_data:
+            break
+        pages.append(agency_data)
+        if not agency_data.get('page_metadata', {}).get('hasNext', False):
+            break
+
+    return pages
+
+
+def compact_award(award: dict) -> dict:
+    """Project an award onto the fields the spending analysis actually uses.
+
+    Drops identifiers and duplicated agency columns the prompt never refers to
+    and truncates the free-text description, which keeps the prompt small.
+    """
+    return {
+        "id": award.get("Award ID"),
+        "recipient": award.get("Recipient Name"),
+        "amount": award.get("Award Amount"),
+        "date": award.get("Award Date") or award.get("Start Date"),
+        "desc": (award.get("Award Description") or "")[:MAX_DESCRIPTION_CHARS],
+        "naics": award.get("NAICS"),
+    }
+
+
 def generate_usa_spending_analysis(agency_name: str, bureau_name: str) -> str:
     """
     Generate analysis of USA spending data for given agency and bureau using LLM.
@@ -153,52 +247,47 @@ def generate_usa_spending_analysis(agency_name: str, bureau_name: str) -> str:
         String containing LLM analysis of the spending data
     """
 
-    # Collect all agency data
-    all_agency_data = ""
-    page = 1
-    has_next = True
-
-    while has_next and len(all_agency_data) < 50:
-        agency_data = search_awards_by_agency(
-            agency_name=agency_name,
-        bureau_name=bureau_name,
-            page=page
-        )
-
-        if not agency_data:
+    # Collect all agency data as compact JSON, one page per line
+    parts: List[str] = []
+    record_count = 0
+    total_chars = 0
+    for agency_data in fetch_award_pages(agency_name, bureau_name):
+        results = agency_data.get('results', [])[:MAX_AWARD_RECORDS - record_count]
+        if not results:
+            break
+        compact_results = [compact_award(award) for award in results]
+        # orjson output is compact by default and much cheaper to produce than json.dumps
+        page_data = orjson.dumps(compact_results).decode()
+        if total_chars + len(page_data) > MAX_CONTEXT_CHARS:
+            logger.info("USASpending data reached the %d character budget; dropping later pages",
+                        MAX_CONTEXT_CHARS)
             break
-            
-        # all_agency_data.extend(agency_data.get('results', []))
-        all_agency_data += str(agency_data.get('results', [])) + "\n"
-        page_metadata = agency_data.get('page_metadata', {})
-        has_next = page_metadata.get('hasNext', False)
-        page += 1
+        parts.append(page_data)
+        record_count += len(results)
+        total_chars += len(page_data)
+    all_agency_data = "\n".join(parts)
+    logger.info("USASpending award cache: %(hits)d hits, %(misses)d misses", award_cache.stats)
 
     
-    # Create prompt for LLM analysis
+    # Static instructions go first so the provider can reuse the cached prompt prefix
     prompt = f"""
-    Analyze the following USA spending data for {agency_name} - {bureau_name}:
-    
-    Please provide:
-    1. Key spending patterns and trends
-    2. Notable contractors and award sizes
-    3. Main categories of spending
-
-    DO NOT NOTE:
-    1. If there is a 0 or empty column, or anything that is a data error, DO NOT comment on it.
+    Agency: {agency_name} - {bureau_name}
 
     Agency Spending Data: {all_agency_data}
     """
 
     # Replace the commented section (lines 194-201) with:
     try:
-        response = client.chat.completions.create(
+        analysis = llm_cache.complete(
             model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
+            messages=[
+                {"role": "system", "content": USASPENDING_ANALYSIS_INSTRUCTIONS},
+                {"role": "user", "content": prompt}
+            ],
+            scope=f"{agency_name}|{bureau_name}",
             max_tokens=2000,
             temperature=0.3
         )
-        analysis = response.choices[0].message.content
         return analysis
     except Exception as exc:
         logger.error("OpenAI request failed: %s", exc)
@@ -1,30 +1,64 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+import requests_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def find_bureaus_with_chief(agency_code):
+# Reuse keep-alive connections across pages and retry transient failures.
+# Bureau lists rarely change, so GET responses are cached on disk for an hour
+# (or as long as the API's Cache-Control headers allow).
+session = requests_cache.CachedSession(
+    "http_cache", backend="sqlite", expire_after=3600, cache_control=True)
+_adapter = HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+)
+session.mount("http://", _adapter)
+session.mount("https://", _adapter)
+
+def fetch_sub_components_page(agency_code, page):
     base_url = f"https://api.usaspending.gov/api/v2/agency/{agency_code}/sub_components/"
-    page = 1
-    matches = []
+    params = {'page': page}
+    response = session.get(base_url, params=params)
+    print(response.url)
+    response.raise_for_status()
+    return response.json()
 
-    while True:
-        params = {'page': page}
-        response = requests.get(base_url, params=params)
-        print(response.url)
-        response.raise_for_status()
-        data = response.json()
-        bureaus = data.get('results', [])
+def find_bureaus_with_chief(agency_code):
+    first_page = fetch_sub_components_page(agency_code, 1)
+    pages = [first_page]
+    page_metadata = first_page['page_metadata']
+
+    if page_metadata['hasNext']:
+        total = page_metadata.get('total')
+        limit = page_metadata.get('limit')
+        if total and limit:
+            # Page 1 tells us how many pages exist, so fetch the rest concurrently
+            last_page = math.ceil(total / limit)
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                pages.extend(executor.map(
+                    lambda page: fetch_sub_components_page(agency_code, page),
+                    range(2, last_page + 1)
+                ))
+        else:
+            # No page count reported: walk the remaining pages in order
+            page = 1
+            while pages[-1]['page_metadata']['hasNext']:
+                page += 1
+                pages.append(fetch_sub_components_page(agency_code, page))
 
-        for bureau in bureaus:
+    matches = []
+    for data in pages:
+        for bureau in data.get('results', []):
             # Adjust the field name if it's not 'name'
             name = bureau.get('name', '')
             print(name)
             if 'chief' in name.lower():
                 matches.append(bureau)
 
-        # Pagination logic: adjust if the API uses a different field
-        if not data['page_metadata']['hasNext']:
-            break
-        page += 1
-
     return matches
 
 # Example usage:
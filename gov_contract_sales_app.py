@@ -1,21 +1,32 @@
+import codecs
 import logging
 import os
+import re
+import sys
+import socket
+import threading
+import time
 import urllib.parse
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import argparse
+import atexit
 from dotenv import load_dotenv
-import markdown
 import html
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
-from bs4 import BeautifulSoup
+import lxml.html
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
 from openai import OpenAI
-from playwright.sync_api import sync_playwright
 
 # Import USASpending processor
 from BetterUSASpending import generate_usa_spending_analysis
-from linkedin_agents import LinkedinProfileAgent, LinkedinEndorsementAgent
+from linkedin_agents import LinkedinProfileAgent, LinkedinCombinedAgent
+from llm_cache import DiskCache, SemanticCache
 # =============================================================================
 # CONFIGURATION AND SETUP
 # =============================================================================
@@ -30,11 +41,169 @@ if not openai_api_key:
 if not perplexity_api_key:
     raise EnvironmentError("PERPLEXITY_API_KEY not set")
 client = OpenAI(api_key=openai_api_key)
+llm_cache = SemanticCache(client)
+# Search result links and extracted page text, so reruns for the same person skip the network
+search_cache = DiskCache("search_results", ttl=24 * 60 * 60)
+page_text_cache = DiskCache("page_text", ttl=24 * 60 * 60)
 
 # Logging setup
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pages are read only up to this many bytes, and their text kept only up to this many
+# characters; anything longer burns bandwidth and LLM tokens without adding much.
+MAX_PAGE_BYTES = 2_000_000
+MAX_PAGE_TEXT_CHARS = 50_000
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+def _is_html(response: requests.Response) -> bool:
+    """Whether a response is (or does not say it isn't) an HTML page."""
+    content_type = response.headers.get("Content-Type", "").lower()
+    return not content_type or content_type.startswith(HTML_CONTENT_TYPES)
+
+def _make_adapter() -> HTTPAdapter:
+    """Pooled adapter that retries failed connections and 429/5xx responses.
+
+    POST is retried too, but never after a read timeout: by then the server may
+    already be working on (and billing for) the request, so resending it would
+    multiply both cost and latency.
+    """
+    return HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=50,
+        max_retries=Retry(
+            total=3,
+            read=0,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset({"GET", "POST"}),
+        ),
+    )
+
+# Shared HTTP session: keep-alive connection reuse plus retries on transient failures.
+# Responses are not HTTP-cached: an HTTP cache reads each body in full before the
+# caller sees it, defeating the page size and time limits. Search results and
+# extracted page text have their own caches instead.
+session = requests.Session()
+session.mount("http://", _make_adapter())
+session.mount("https://", _make_adapter())
+session.headers.update({
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+})
+
+# Pages are scraped without retries: each retry would restart the connect and read
+# timeouts, letting one hung host run far past MAX_PAGE_SECONDS. A failed page is skipped.
+scrape_session = requests.Session()
+scrape_session.mount("http://", HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=0))
+scrape_session.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=0))
+scrape_session.headers.update(session.headers)
+
+# Perplexity gets its own session so the API key header is never sent to scraped sites
+PERPLEXITY_URL = "https://api.perplexity.ai/chat/completions"
+perplexity_session = requests.Session()
+perplexity_session.mount("https://", _make_adapter())
+perplexity_session.headers.update({
+    "Authorization": f"Bearer {perplexity_api_key}",
+    "Content-Type": "application/json"
+})
+
+# Seconds allowed for one page to download, so a slow host cannot hold up the report.
+# Connecting and waiting for the response headers come out of the same budget.
+MAX_PAGE_SECONDS = 8
+PAGE_CONNECT_SECONDS = 3
+
+# Kept identical across calls so the summary prompt shares a cacheable prefix
+SUMMARY_INSTRUCTIONS = """
+You are an intelligence agent generating a briefing on the subject named by the user.
+
+Your goal is to produce a short, highly specific profile for a salesperson preparing for a call. This is not a biography. This is tactical pre-call intel.
+
+    ## Instructions:
+    - Focus on what this person has **done**: projects, technologies, contracts, teams.
+    - Pull **concrete details**: systems worked on, budget responsibilities, transformation efforts, orgs partnered with.
+    - Include **contextual hooks** for outreach: problems they’re tackling, tools they’ve deployed, initiatives they’re leading.
+    - If they mention other people (collaborators, managers, execs), **note those relationships**.
+    - For each fact or insight, include the **source title** with a **Markdown-style italicized link** on the next line. Like this:  
+    _[Source Title](https://example.com)_
+
+    ## Formatting:
+    - Use **one short paragraph or bullet per insight**, each separated by a blank line.
+    - Avoid generic traits like “thought leader” or “focuses on strategy” unless tied to a specific program or output.
+    - Never use hedging language like “likely,” “seems to,” “might be involved.”
+    - Do **not** repeat information or list general credentials unless they relate to actual influence.
+
+    ## Your Output:
+    Begin with a brief markdown heading:
+
+    Then proceed with your insights.
+"""
+
+# Static instructions for the research calls. Only the subject and context vary per
+# call and go in the user message, so every call of a kind shares a cacheable prefix.
+SEARCH_INSTRUCTIONS = (
+    "You are a helpful assistant that searches for and provides relevant professional information. "
+    "Focus on professional background, recent activities, government contracting experience, and any "
+    "publicly available information that would be useful for a sales call preparation. Provide specifics "
+    "about technical information, past contracts, and any relevant technologies or projects they have "
+    "been involved with."
+)
+
+RESEARCH_DETAILS_INSTRUCTIONS = (
+    "You are a researcher that finds related coworkers, connections and technical expertise of the "
+    "person named by the user. Based on the provided context, dive deeper into both.\n"
+    "adjacent_personnel: managers, supervisors, collaborators, or support staff associated with them "
+    "at their agency. Focus on organizational structure, team members, and professional relationships. "
+    "Provide names and roles if available.\n"
+    "expertise: technical expertise, skills, technologies, systems experience, and procurement expertise. "
+    "Focus on specific technologies, certifications, technical background, and specialized knowledge "
+    "areas. If available, provide key names of technical products and services used."
+)
+
+# Both research details come back in one structured answer
+RESEARCH_DETAILS_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "schema": {
+            "type": "object",
+            "properties": {
+                "adjacent_personnel": {"type": "string"},
+                "expertise": {"type": "string"}
+            },
+            "required": ["adjacent_personnel", "expertise"]
+        }
+    }
+}
+
+PERSONAL_INSTRUCTIONS = (
+    "You are a friend of the person named by the user. You look through social media as well as key "
+    "results to find insights that might help establish a connection to them. Find information that is "
+    "**non-professional** but might be useful in introductions as well as establishing a personal connection."
+)
+
+SEARCH_REQUEST_TEMPLATE = "Search for and provide relevant information about: {query}."
+SUBJECT_TEMPLATE = "Subject: {name} at {agency}"
+SUBJECT_CONTEXT_TEMPLATE = SUBJECT_TEMPLATE + "\n\nContext:\n{context}"
+
+# DuckDuckGo result links; soupsieve matches the comma-separated union in one tree walk
+DUCKDUCKGO_RESULT_SELECTOR = (
+    "a.result__a, a[href*='uddg'], .result__body a, .web-result a, a[href^='http']"
+)
+
+# Elements whose text is code, markup or fallback content rather than page content
+NON_CONTENT_TAGS = ("script", "style", "noscript", "iframe", "svg", "template")
+
+# Runs of whitespace collapsed to a single space in scraped page text
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Punctuation in a person's name ("Jane A. Smith-Jones, Jr."), replaced by spaces
+_NAME_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+# Review verdict asking for changes, with or without markdown bold around it
+_NEEDS_IMPROVEMENT_RE = re.compile(r"needs_improvement:\s*\**\s*true", re.IGNORECASE)
+
+# Numbered ("1.", "12.") or bulleted ("•", "-", "*") summary lines; group 1 is the content
+_BULLET_RE = re.compile(r"^(?:\d{1,2}\.|[•\-*])\s*(.*)$")
+
 # =============================================================================
 # WEB SCRAPING UTILITIES
 # =============================================================================
@@ -44,13 +213,14 @@ def fetch_duckduckgo_results(query: str, max_results: int = 5) -> List[str]:
     """Fetch search result links from DuckDuckGo."""
     search_url = "https://duckduckgo.com/html/"
     params = {"q": query}
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+
+    cache_key = DiskCache.make_key(query, max_results)
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     try:
-        response = requests.post(
-            search_url, data=params, headers=headers, timeout=10)
+        response = session.post(search_url, data=params, timeout=10)
         response.raise_for_status()
         logger.info("DuckDuckGo search response status: %d",
                     response.status_code)
@@ -58,263 +228,247 @@ def fetch_duckduckgo_results(query: str, max_results: int = 5) -> List[str]:
         logger.error("Search request failed: %s", exc)
         return []
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    links = []
+    from bs4 import BeautifulSoup
 
-    # Try multiple selectors for DuckDuckGo results
-    selectors = [
-        "a.result__a",
-        "a[href*='uddg']",
-        ".result__body a",
-        ".web-result a",
-        "a[href^='http']"
-    ]
+    # lxml is the C-backed tree builder; soupsieve selectors work the same on it
+    soup = BeautifulSoup(response.text, "lxml")
+    links = []
+    seen = set()
 
-    for selector in selectors:
-        for a in soup.select(selector):
-            href = a.get("href")
-            if href:
-                # Handle DuckDuckGo's redirect URLs
-                if "uddg=" in href:
-                    # Extract the actual URL from DuckDuckGo's redirect
-                    parsed = urllib.parse.parse_qs(
-                        urllib.parse.urlparse(href).query)
-                    if "uddg" in parsed:
-                        href = urllib.parse.unquote(parsed["uddg"][0])
-
-                    if href and href.startswith("http") and "duckduckgo.com" not in href:
-                        if href not in links:  # Avoid duplicates
-                            links.append(href)
-                            logger.info("Found URL: %s", href)
-                        if len(links) >= max_results:
-                            break
-        if links:  # If we found links with this selector, no need to try others
+    # All known result-link selectors, combined so the document is walked once.
+    # iselect yields matches lazily, so the walk stops once max_results are found.
+    for a in soup.css.iselect(DUCKDUCKGO_RESULT_SELECTOR):
+        href = a.get("href")
+        if not href:
+            continue
+        # Handle DuckDuckGo's redirect URLs
+        if "uddg=" in href:
+            # Extract the actual URL from DuckDuckGo's redirect
+            parsed = urllib.parse.parse_qs(
+                urllib.parse.urlparse(href).query)
+            if "uddg" in parsed:
+                href = urllib.parse.unquote(parsed["uddg"][0])
+
+        if not href.startswith("http") or "duckduckgo.com" in href or href in seen:
+            continue
+        seen.add(href)
+        links.append(href)
+        logger.info("Found URL: %s", href)
+        if len(links) >= max_results:
             break
 
     logger.info("Found %d search result URLs", len(links))
+    if links:
+        search_cache.set(cache_key, links)
     return links
 
+def _abort_response(response: requests.Response) -> None:
+    """Shut down a streaming response's socket, so a read blocked on it returns at once."""
+    connection = getattr(response.raw, "connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
 def scrape_page_text(url: str) -> str:
     """Retrieve plain text from a webpage."""
+    # Only the extracted text is cached, which is far smaller than the page itself
+    cached = page_text_cache.get(url)
+    if cached is not None:
+        return cached
+
+    # Stream the body so non-HTML responses are never downloaded and large pages are cut off
+    started = time.monotonic()
+    deadline = started + MAX_PAGE_SECONDS
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
+        with scrape_session.get(
+                url, timeout=(PAGE_CONNECT_SECONDS, MAX_PAGE_SECONDS - PAGE_CONNECT_SECONDS),
+                stream=True) as response:
+            response.raise_for_status()
+            if not _is_html(response):
+                logger.info("Skipping non-HTML content at %s (%s)",
+                            url, response.headers.get("Content-Type"))
+                return ""
+            # A read blocks until its chunk is full, so a slowly trickling page could
+            # run past the deadline between checks; the watchdog cuts it off on time
+            watchdog = threading.Timer(
+                max(0.0, deadline - time.monotonic()), _abort_response, (response,))
+            watchdog.start()
+            try:
+                body = bytearray()
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    body += chunk
+                    if len(body) >= MAX_PAGE_BYTES:
+                        logger.info("Truncating %s at %d bytes", url, MAX_PAGE_BYTES)
+                        break
+            finally:
+                watchdog.cancel()
+            if time.monotonic() >= deadline:
+                raise TimeoutError
     except Exception as exc:
-        logger.error("Failed to fetch %s: %s", url, exc)
+        if time.monotonic() >= deadline:
+            logger.error("Gave up on %s after %.1fs", url, time.monotonic() - started)
+        else:
+            logger.error("Failed to fetch %s: %s", url, exc)
         return ""
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    # Remove scripts and styles
-    for tag in soup(["script", "style"]):
-        tag.decompose()
-    text = " ".join(chunk.strip() for chunk in soup.stripped_strings)
+    # Hand lxml the raw bytes. A charset from the Content-Type header wins; otherwise
+    # lxml detects it from the page's <meta charset> (or a BOM) itself
+    content_type = response.headers.get("Content-Type", "")
+    try:
+        if "charset=" in content_type.lower():
+            # Normalize aliases such as "latin-1" to names libxml2 recognizes
+            parser = lxml.html.HTMLParser(encoding=codecs.lookup(response.encoding).name)
+        else:
+            parser = lxml.html.HTMLParser()
+        tree = lxml.html.fromstring(bytes(body[:MAX_PAGE_BYTES]), parser=parser)
+    except (etree.ParserError, LookupError, ValueError) as exc:
+        logger.error("Failed to parse %s: %s", url, exc)
+        return ""
+
+    # Remove non-content elements, then collapse whitespace in one pass
+    etree.strip_elements(tree, *NON_CONTENT_TAGS, with_tail=False)
+    text = _WHITESPACE_RE.sub(" ", " ".join(tree.itertext())).strip()[:MAX_PAGE_TEXT_CHARS]
+    if text:
+        page_text_cache.set(url, text)
     return text
 
 # =============================================================================
 # API SEARCH FUNCTIONS
 # =============================================================================
 
-def search_with_openai(query: str) -> str:
-    """Use OpenAI's search API to find relevant information."""
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"Search for and provide relevant information about: {query}. Focus on professional background, recent activities, government contracting experience, and any publicly available information that would be useful for a sales call preparation. Provide specifics about technical information, past contracts, and any relevant technologies or projects they have been involved with."
-                }
-            ],
-            max_tokens=700,
-            temperature=0.3
+def _post_perplexity(data: Dict) -> Tuple[str, str]:
+    """Send a chat request to Perplexity and return its answer and search result links."""
+    # orjson encodes straight to bytes; the session already sends the JSON Content-Type
+    response = perplexity_session.post(PERPLEXITY_URL, data=orjson.dumps(data), timeout=30)
+    response.raise_for_status()
+
+    # orjson decodes the raw bytes directly, which is faster on citation-heavy answers
+    result = orjson.loads(response.content)
+    content = result["choices"][0]["message"]["content"]
+
+    # Extract search results if available
+    search_results_text = ""
+    if "search_results" in result:
+        search_results = result["search_results"]
+        search_results_text = "\n".join(
+            f"[{result['title']}]({result['url']})" for result in search_results
         )
-        return response.choices[0].message.content
-    except Exception as exc:
-        logger.error("OpenAI search request failed: %s", exc)
-        return ""
 
-def search_with_perplexity(query: str) -> str:
-    """Use Perplexity's search API to find relevant information."""
-    try:
-        headers = {
-            "Authorization": f"Bearer {perplexity_api_key}",
-            "Content-Type": "application/json"
-        }
+    return content, search_results_text
+
+def _make_perplexity_request(messages: List[Dict[str, str]], max_tokens: int,
+                             temperature: float, model: str = "sonar") -> str:
+    """Send a chat request to Perplexity and return the answer followed by its search result links."""
+    data = {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "return_citations": True,
+        "return_images": False
+    }
 
-        data = {
-            "model": "sonar",
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that searches for and provides relevant professional information."
-                },
-                {
-                    "role": "user",
-                    "content": f"Search for and provide relevant information about: {query}. Focus on professional background, recent activities, government contracting experience, and any publicly available information that would be useful for a sales call preparation. Provide specifics about technical information as well as past contracts."
-                }
-            ],
-            "max_tokens": 2000,
-            "temperature": 0.3,
-            "return_citations": True,
-            # "search_domain_filter": ["perplexity.ai"],
-            "return_images": False,
-            # "return_sources": True
-        }
+    content, search_results_text = _post_perplexity(data)
+    return content + search_results_text
 
-        response = requests.post(
-            "https://api.perplexity.ai/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=30
-        )
-        response.raise_for_status()
+def subject_scope(name: str, agency: str) -> str:
+    """Semantic cache scope for searches about a person: their normalized name and agency.
 
-        result = response.json()
-        content = result["choices"][0]["message"]["content"]
+    Case, punctuation and spacing are dropped, so "Jane A. Smith" and
+    "jane a smith" share a scope and a rephrased search can be answered from
+    cache. Initials are kept, so "John A. Smith" and "John B. Smith" at the
+    same agency never match each other however alike their queries read.
+    """
+    name_parts = _NAME_PUNCTUATION_RE.sub(" ", name.lower()).split()
+    return f"{' '.join(name_parts)}|{' '.join(agency.lower().split())}"
 
-        # Extract search results if available
-        search_results_text = ""
-        # print("result: ", result)
-        if "search_results" in result:
-            search_results = result["search_results"]
-            search_results_text = "\n".join(
-                f"[{result['title']}]({result['url']})" for result in search_results
-            )
+def search_with_openai(query: str, scope: str = "") -> str:
+    """Use OpenAI's search API to find relevant information."""
+    payload = {
+        "model": "gpt-4o",
+        "messages": [
+            {"role": "system", "content": SEARCH_INSTRUCTIONS},
+            {"role": "user", "content": SEARCH_REQUEST_TEMPLATE.format(query=query)}
+        ],
+        "max_tokens": 700,
+        "temperature": 0.3
+    }
 
-        return content + search_results_text
+    def request() -> str:
+        response = client.chat.completions.create(**payload)
+        return response.choices[0].message.content
 
+    try:
+        # The semantic cache's exact-match tier already covers verbatim repeats
+        return llm_cache.get_or_create("openai:gpt-4o", query, request, payload, scope=scope)
     except Exception as exc:
-        logger.error("Web search request failed: %s", exc)
+        logger.error("OpenAI search request failed: %s", exc)
         return ""
 
-def extract_adjacent_personnel(context: str, name: str, agency: str) -> str:
-    """Identify managers or collaborators mentioned in the context using Perplexity API."""
+def search_with_perplexity(query: str, scope: str = "") -> str:
+    """Use Perplexity's search API to find relevant information."""
+    messages = [
+        {"role": "system", "content": SEARCH_INSTRUCTIONS},
+        {"role": "user", "content": SEARCH_REQUEST_TEMPLATE.format(query=query)}
+    ]
+    request_args = {"max_tokens": 2000, "temperature": 0.3}
     try:
-        headers = {
-            "Authorization": f"Bearer {perplexity_api_key}",
-            "Content-Type": "application/json"
-        }
-
-        query = (
-            f"Based on the provided context, dive deeper into adjacent individuals and coworkers."
-            f"Search for managers, supervisors, collaborators, or support staff "
-            f"associated with {name} at {agency}. Focus on organizational structure, "
-            f"team members, and professional relationships. Provide names and roles if available."
-        )
-
-        data = {
-            "model": "sonar",
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a detective that finds related coworkers and connections."
-                },
-                {
-                    "role": "user",
-                    "content": f"Search for and provide relevant information about: {query}. Also analyze this context: {context}"
-                }
-            ],
-            "max_tokens": 200,
-            "temperature": 0.5,
-            "return_citations": True,
-            "return_images": False
-        }
-
-        response = requests.post(
-            "https://api.perplexity.ai/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=30
-        )
-        response.raise_for_status()
-
-        result = response.json()
-        content = result["choices"][0]["message"]["content"]
-
-        # Extract search results if available
-        search_results_text = ""
-        if "search_results" in result:
-            search_results = result["search_results"]
-            search_results_text = "\n".join(
-                f"[{result['title']}]({result['url']})" for result in search_results
-            )
-
-        return content + search_results_text
-
+        # Matched by similarity on the query alone; the instructions around it are the same for everyone
+        return llm_cache.get_or_create(
+            "perplexity:sonar", query,
+            lambda: _make_perplexity_request(messages, **request_args),
+            [messages, request_args], scope=scope)
     except Exception as exc:
-        logger.error("Adjacent personnel extraction failed: %s", exc)
+        logger.error("Web search request failed: %s", exc)
         return ""
 
-def tag_expertise(context: str, name: str, agency: str) -> str:
-    """Extract the person's key technical expertise using Perplexity API."""
-    try:
-        headers = {
-            "Authorization": f"Bearer {perplexity_api_key}",
-            "Content-Type": "application/json"
-        }
+def extract_research_details(context: str, name: str, agency: str) -> Dict[str, str]:
+    """Find adjacent personnel and technical expertise for a person in one Perplexity call.
 
-        query = (
-            f"Based on the provided context, dive deeper into expertise."
-            f"Search for technical expertise, skills, technologies, systems experience, "
-            f"and procurement expertise of {name} at {agency}. Focus on specific technologies, "
-            f"certifications, technical background, and specialized knowledge areas."
-            f"If available, provide key names of technical products and services used."
-        )
+    Returns a dict with "adjacent_personnel", "expertise" and "sources" text.
+    If the answer is not valid JSON (e.g. cut off at max_tokens), the raw
+    answer is returned as "adjacent_personnel" so the text is not lost; if the
+    request itself fails, all three are empty.
+    """
+    data = {
+        "model": "sonar",
+        "messages": [
+            {"role": "system", "content": RESEARCH_DETAILS_INSTRUCTIONS},
+            {"role": "user", "content": SUBJECT_CONTEXT_TEMPLATE.format(
+                name=name, agency=agency, context=context)}
+        ],
+        # The two separate calls this replaced had 200 tokens each; the rest is JSON overhead
+        "max_tokens": 600,
+        "temperature": 0.5,
+        "return_citations": True,
+        "return_images": False,
+        "response_format": RESEARCH_DETAILS_FORMAT
+    }
+    try:
+        content, sources = _post_perplexity(data)
+    except Exception as exc:
+        logger.error("Adjacent personnel and expertise extraction failed: %s", exc)
+        return {"adjacent_personnel": "", "expertise": "", "sources": ""}
 
-        data = {
-            "model": "sonar",
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a technical researcher that provides relevant technical and professional expertise information abotu a given individual."
-                },
-                {
-                    "role": "user",
-                    "content": f"Search for and provide relevant information about: {query}. Also analyze this context: {context}"
-                }
-            ],
-            "max_tokens": 200,
-            "temperature": 0.5,
-            "return_citations": True,
-            "return_images": False
+    try:
+        details = orjson.loads(content)
+        return {
+            "adjacent_personnel": details.get("adjacent_personnel", ""),
+            "expertise": details.get("expertise", ""),
+            "sources": sources
         }
-
-        response = requests.post(
-            "https://api.perplexity.ai/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=30
-        )
-        response.raise_for_status()
-
-        result = response.json()
-        content = result["choices"][0]["message"]["content"]
-
-        # Extract search results if available
-        search_results_text = ""
-        if "search_results" in result:
-            search_results = result["search_results"]
-            search_results_text = "\n".join(
-                f"[{result['title']}]({result['url']})" for result in search_results
-            )
-
-        return content + search_results_text
-
-    except Exception as exc:
-        logger.error("Expertise tagging failed: %s", exc)
-        return ""
+    except (orjson.JSONDecodeError, AttributeError) as exc:
+        logger.warning("Research details were not valid JSON, using the raw answer: %s", exc)
+        return {"adjacent_personnel": content, "expertise": "", "sources": sources}
 
 def search_for_personal(query: str, name: str, agency: str) -> str:
     """Use Perplexity's search API to find personal/social information."""
     messages = [
-        {
-            "role": "system",
-            "content": f"You are a friend of {name} from {agency}. You look through social media as well as key results to find insights that might help establish a connection to {name}"
-        },
-        {
-            "role": "user",
-            "content": f"Look through social media and online results to find information that is **non-professional** but might be useful in introductions as well as establishing a personal connection with {name} from {agency}."
-        }
+        {"role": "system", "content": PERSONAL_INSTRUCTIONS},
+        {"role": "user", "content": SUBJECT_TEMPLATE.format(name=name, agency=agency)}
     ]
     return _make_perplexity_request(messages, max_tokens=1000, temperature=0.7)
 
@@ -325,22 +479,21 @@ def search_for_personal(query: str, name: str, agency: str) -> str:
 def gather_information(name: str, agency: str) -> str:
     """Orchestrate the information gathering process from multiple sources."""
     query = f"{name} {agency}"
+    scope = subject_scope(name, agency)
     logger.info("Searching for information on %s", query)
 
     # OpenAI search for additional information (currently disabled)
     logger.info("Using OpenAI search for additional context")
-    # openai_context = search_with_openai(query)
+    # openai_context = search_with_openai(query, scope)
     openai_context = ""
 
     # Perplexity search with search results
     logger.info("Using Broad web search for key context with search results")
-    perplexity_context = search_with_perplexity(query)
+    perplexity_context = search_with_perplexity(query, scope)
 
-    # Extract additional structured information using dedicated roles
+    # Extract adjacent personnel and expertise together in one structured request
     logger.info("Extracting adjacent personnel and expertise")
-    adjacent_info = extract_adjacent_personnel(
-        perplexity_context, name, agency)
-    expertise_info = tag_expertise(perplexity_context, name, agency)
+    details = extract_research_details(perplexity_context, name, agency)
     # personal_info = search_for_personal(
     #     perplexity_context, name, agency
     # )
@@ -349,13 +502,19 @@ def gather_information(name: str, agency: str) -> str:
     combined_context = (
         f"\nWeb Search Results:\n{perplexity_context}\n"
         # f"OpenAI Research:\n{openai_context}\n\n"
-        f"Adjacent Personnel:\n{adjacent_info}\n"
-        f"Technical Expertise:\n{expertise_info}\n"
+        f"Adjacent Personnel:\n{details['adjacent_personnel']}\n"
+        f"Technical Expertise:\n{details['expertise']}\n"
+        f"{details['sources']}\n"
         # f"Personal Information:\n{personal_info}\n"
     )
 
     return combined_context
 
+def _echo_stream(text: str) -> None:
+    """Print streamed completion text as soon as it arrives."""
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
 def generate_summary(context: str, name: str, agency: str) -> str:
     """Generate initial summary from gathered context."""
     # prompt = (
@@ -373,50 +532,70 @@ def generate_summary(context: str, name: str, agency: str) -> str:
     #     "Information:\n" + context
     # )
 
+    # Static instructions go first so the provider can reuse the cached prompt prefix
     prompt = f"""
-    You are an intelligence agent generating a briefing on {name} from {agency}.
-
-    Your goal is to produce a short, highly specific profile for a salesperson preparing for a call. This is not a biography. This is tactical pre-call intel.
-
-        ## Instructions:
-        - Focus on what this person has **done**: projects, technologies, contracts, teams.
-        - Pull **concrete details**: systems worked on, budget responsibilities, transformation efforts, orgs partnered with.
-        - Include **contextual hooks** for outreach: problems they’re tackling, tools they’ve deployed, initiatives they’re leading.
-        - If they mention other people (collaborators, managers, execs), **note those relationships**.
-        - For each fact or insight, include the **source title** with a **Markdown-style italicized link** on the next line. Like this:  
-        _[Source Title](https://example.com)_
-
-        ## Formatting:
-        - Use **one short paragraph or bullet per insight**, each separated by a blank line.
-        - Avoid generic traits like “thought leader” or “focuses on strategy” unless tied to a specific program or output.
-        - Never use hedging language like “likely,” “seems to,” “might be involved.”
-        - Do **not** repeat information or list general credentials unless they relate to actual influence.
+    Subject: {name} from {agency}
 
-        ## Your Output:
-        Begin with a brief markdown heading:
-
-        Then proceed with your insights.
-
-        ## Raw Information:
-        {context}
+    ## Raw Information:
+    {context}
     """
 
     try:
-        response = client.chat.completions.create(
+        return llm_cache.complete(
             model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
+            messages=[
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                {"role": "user", "content": prompt}
+            ],
+            scope=f"{name}|{agency}",
+            on_delta=_echo_stream,
             max_tokens=1000,
             temperature=0.6
         )
-        return response.choices[0].message.content
     except Exception as exc:
         logger.error("OpenAI request failed: %s", exc)
         return ""
+    finally:
+        sys.stdout.write("\n")
 
 # =============================================================================
 # REVIEW AND IMPROVEMENT
 # =============================================================================
 
+def _collect_review_stream(response: requests.Response) -> str:
+    """Assemble a streamed Perplexity review into the JSON of a non-streamed response.
+
+    The review's first line is its verdict, so reading stops as soon as that
+    line says no improvement is needed rather than waiting for the feedback.
+    """
+    pieces = []
+    search_results = []
+    verdict_checked = False
+    for line in response.iter_lines():
+        if not line.startswith(b"data:"):
+            continue
+        payload = line[len(b"data:"):].strip()
+        if payload == b"[DONE]":
+            break
+        chunk = orjson.loads(payload)
+        search_results = chunk.get("search_results") or search_results
+        if not chunk.get("choices"):
+            continue
+        delta = chunk["choices"][0].get("delta", {}).get("content") or ""
+        pieces.append(delta)
+
+        if not verdict_checked and "\n" in delta:
+            verdict_checked = True
+            verdict = "".join(pieces).split("\n", 1)[0]
+            if verdict.strip().lower() == "needs_improvement: false":
+                logger.info("Review found no improvements needed; skipping the rest of the stream")
+                break
+
+    result = {"choices": [{"message": {"content": "".join(pieces)}}]}
+    if search_results:
+        result["search_results"] = search_results
+    return orjson.dumps(result).decode()
+
 def review_agent(summary: str, name: str, agency: str) -> Dict[str, any]:
     """Review Agent using Perplexity's Sonar Pro to evaluate summary accuracy and completeness."""
     review_prompt = (
@@ -437,11 +616,6 @@ def review_agent(summary: str, name: str, agency: str) -> Dict[str, any]:
     )
 
     try:
-        headers = {
-            "Authorization": f"Bearer {perplexity_api_key}",
-            "Content-Type": "application/json"
-        }
-
         data = {
             "model": "sonar-pro",
             "messages": [{"role": "user", "content": review_prompt}],
@@ -449,23 +623,26 @@ def review_agent(summary: str, name: str, agency: str) -> Dict[str, any]:
             "temperature": 0.6
         }
 
-        response = requests.post(
-            "https://api.perplexity.ai/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=30
-        )
-        response.raise_for_status()
-        result = response.json()
+        def request() -> str:
+            with perplexity_session.post(
+                PERPLEXITY_URL,
+                data=orjson.dumps({**data, "stream": True}),
+                timeout=30,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                return _collect_review_stream(response)
+
+        # The response is cached so an unchanged summary is never re-reviewed.
+        # Exact matches only: a near-identical summary can still need a different review.
+        result = orjson.loads(llm_cache.get_or_create(
+            "perplexity:sonar-pro", review_prompt, request, data, similar=False))
         review_content = result["choices"][0]["message"]["content"]
 
         # Parse the response
-        needs_improvement = (
-            "needs_improvement: true" in review_content.lower() or
-            "**needs_improvement:** false" in review_content.lower()
-        )
+        needs_improvement = bool(_NEEDS_IMPROVEMENT_RE.search(review_content))
         feedback_lines = review_content.split("\n")
-        feedback = "\n".join([line for line in feedback_lines[1:]])
+        feedback = "\n".join(feedback_lines[1:])
         if "search_results" in result:
             search_results = result["search_results"]
             search_results_text = "\n".join(
@@ -506,13 +683,14 @@ def writer_agent(original_summary: str, feedback: str, name: str, agency: str, c
     )
 
     try:
-        response = client.chat.completions.create(
+        # Exact-match cached: a rerun with the same summary and feedback reuses the rewrite
+        return llm_cache.complete(
             model="gpt-4o",
             messages=[{"role": "user", "content": improvement_prompt}],
+            similar=False,
             max_tokens=2000,
             temperature=0.7
         )
-        return response.choices[0].message.content
     except Exception as exc:
         logger.error(f"Writer agent failed: {exc}")
         return original_summary
@@ -557,6 +735,54 @@ def review_and_improve_summary(initial_summary: str, name: str, agency: str, con
 # PDF REPORT GENERATION
 # ==============================================================================
 
+# One Chromium process and one browser context are created on first use and
+# shared by every report in this run, so the Tailwind CDN script is fetched once
+# per run. The context is in memory rather than a persistent on-disk profile:
+# Chromium allows one process per profile directory, so a second CLI run started
+# while another is rendering would fail to launch. Sync Playwright objects belong
+# to the thread that created them, so reports must be rendered from a single thread.
+_playwright = None
+_browser = None
+_browser_context = None
+
+def _get_browser_context():
+    """Return the shared browser context, launching Chromium on first use."""
+    global _playwright, _browser, _browser_context
+    if _browser_context is None:
+        # Imported here so the CLI does not pay Playwright's import cost until a PDF is made
+        from playwright.sync_api import sync_playwright
+
+        playwright = sync_playwright().start()
+        try:
+            browser = playwright.chromium.launch(args=["--disable-gpu"])
+        except Exception:
+            # Stop the driver so the next report can start a new one
+            playwright.stop()
+            raise
+        _playwright, _browser = playwright, browser
+        atexit.register(_close_browser)
+        _browser_context = browser.new_context()
+    return _browser_context
+
+def _close_browser() -> None:
+    """Shut down the shared browser and its Playwright driver."""
+    global _playwright, _browser, _browser_context
+    if _browser is not None:
+        _browser.close()
+        _playwright.stop()
+        _browser_context = _browser = _playwright = None
+
+# Built once and reset between documents instead of re-registering extensions per call
+_markdown_converter = None
+
+def _markdown_to_html(text: str) -> str:
+    """Convert markdown to HTML with the shared 'extra'-enabled converter."""
+    global _markdown_converter
+    if _markdown_converter is None:
+        import markdown
+        _markdown_converter = markdown.Markdown(extensions=['extra'])
+    return _markdown_converter.reset().convert(text)
+
 def generate_pdf_report(summary: str, name: str, agency: str, output_path: str = "sales_report.pdf", 
                         usaspending_analysis: str = None, linkedin_summary: str = None) -> str:
     """Generate a formatted PDF report using Playwright and Tailwind CSS.
@@ -570,19 +796,20 @@ def generate_pdf_report(summary: str, name: str, agency: str, output_path: str =
         linkedin_summary: Optional LinkedIn summary in markdown format
     """
 
-    import markdown
     # Convert markdown summary to HTML
-    summary_html = markdown.markdown(summary, extensions=['extra'])
+    summary_html = _markdown_to_html(summary)
     
     # Convert USASpending analysis to HTML if provided
     usaspending_html = ""
     if usaspending_analysis:
-        usaspending_html = markdown.markdown(usaspending_analysis, extensions=['extra'])
+        usaspending_html = _markdown_to_html(usaspending_analysis)
         
     # Convert LinkedIn summary to HTML if provided
     linkedin_html = ""
     if linkedin_summary:
-        linkedin_html = markdown.markdown(linkedin_summary, extensions=['extra'])
+        linkedin_html = _markdown_to_html(linkedin_summary)
+
+    generated_on = datetime.datetime.now().strftime('%B %d, %Y at %I:%M %p')
 
     tailwind_html = f"""
         <!DOCTYPE html>
@@ -597,7 +824,7 @@ def generate_pdf_report(summary: str, name: str, agency: str, output_path: str =
             <div class="border-b-4 border-blue-600 pb-4 mb-8">
             <h1 class="text-4xl font-bold text-blue-600 mb-2">Sales Call Preparation</h1>
             <h2 class="text-2xl font-semibold text-gray-800">{html.escape(name)} at {html.escape(agency)}</h2>
-            <p class="text-sm text-gray-500 mt-2">Generated on {__import__('datetime').datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
+            <p class="text-sm text-gray-500 mt-2">Generated on {generated_on}</p>
             </div>
             
             <div class="bg-gray-50 rounded-lg p-6 mb-8">
@@ -635,13 +862,17 @@ def generate_pdf_report(summary: str, name: str, agency: str, output_path: str =
         """
 
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch()
-            page = browser.new_page()
-            page.set_content(tailwind_html)
-
-            # Wait for Tailwind to load
-            page.wait_for_timeout(2000)
+        # Only the page is per report; the context and its warm cache are reused
+        page = _get_browser_context().new_page()
+        try:
+            # Returns once the Tailwind CDN script has loaded and the network has
+            # gone quiet, instead of always sleeping for a fixed two seconds. A slow
+            # CDN only costs the styling: the content is in place, so print anyway.
+            from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+            try:
+                page.set_content(tailwind_html, wait_until="networkidle", timeout=5000)
+            except PlaywrightTimeoutError:
+                logger.warning("Page styles did not finish loading; printing the PDF as is")
 
             page.pdf(
                 path=output_path,
@@ -654,7 +885,8 @@ def generate_pdf_report(summary: str, name: str, agency: str, output_path: str =
                     "right": "0.5in"
                 }
             )
-            browser.close()
+        finally:
+            page.close()
 
         logger.info(f"PDF report generated successfully: {output_path}")
         return output_path
@@ -693,6 +925,31 @@ def generate_report_file(final_summary: str, name: str, agency: str, tag: str =
         print("\n❌ Failed to generate PDF report")
         return ""
 
+def summarize_linkedin(name: str, agency: str) -> Tuple[str, str]:
+    """Summarize the extracted LinkedIn profile and endorsements.
+
+    Returns:
+        The profile summary and the endorsement summary (empty if there are
+        no extracted skills files)
+    """
+    profile_path = "extracted_text/Profile.txt"
+
+    # Get list of available skills files
+    skill_files = [
+        "extracted_text/skills.txt",
+        "extracted_text/skills-2.txt", 
+        "extracted_text/skills-3.txt"
+    ]
+    existing_files = [f for f in skill_files if os.path.exists(f)]
+    
+    # Only process endorsements if skill files exist; both documents then go in one request
+    if existing_files:
+        result = LinkedinCombinedAgent(profile_path, existing_files, name, agency).process()
+        return result["profile"], result["endorsements"]
+
+    profile_agent = LinkedinProfileAgent(profile_path, name, agency)
+    return profile_agent.process_profile(), ""
+
 def main():
     load_dotenv()
     parser = argparse.ArgumentParser(
@@ -707,6 +964,20 @@ def main():
     # Convert agency list to a single string
     agency = args.agency
 
+    # The USASpending analysis and the LinkedIn summaries do not depend on the
+    # person research, so they run in the background while Perplexity and
+    # OpenAI are queried and the summary is reviewed below
+    background = ThreadPoolExecutor(max_workers=2)
+    usaspending_future = background.submit(generate_usa_spending_analysis, agency, args.bureau)
+
+    # Process LinkedIn profile and endorsements (if not bypassed)
+    print(args.bypass_linkedin)
+    if not args.bypass_linkedin:
+        linkedin_future = background.submit(summarize_linkedin, args.name, agency)
+    else:
+        linkedin_future = None
+        logger.info("LinkedIn processing bypassed")
+
     # Gather personal information
     # context = ""
     context = gather_information(args.name, agency)
@@ -716,42 +987,24 @@ def main():
     # summary = ""
     summary = generate_summary(context, args.name, agency)
 
+    # report_path = generate_report_file(full_report_content, args.name, agency, "original", usaspending)
+
+    final_summary = review_and_improve_summary(
+        summary, args.name, agency, context)
+
     usaspending = ""
     # if args.bureau:
-    usaspending = generate_usa_spending_analysis(agency, args.bureau)
+    usaspending = usaspending_future.result()
     # else:
     #     logger.info("No bureau specified, skipping USASpending analysis")
-
-    # Process LinkedIn profile and endorsements (if not bypassed)
-    print(args.bypass_linkedin)
-    if not args.bypass_linkedin:
-        profile_agent = LinkedinProfileAgent("extracted_text/Profile.txt", args.name, agency)
-        profile_summary = profile_agent.process_profile()
-
-        # Get list of available skills files
-        skill_files = [
-            "extracted_text/skills.txt",
-            "extracted_text/skills-2.txt", 
-            "extracted_text/skills-3.txt"
-        ]
-        existing_files = [f for f in skill_files if os.path.exists(f)]
-        
-        # Only process endorsements if skill files exist
-        if existing_files:
-            endorsement_agent = LinkedinEndorsementAgent(existing_files, args.name, agency)
-            endorsement_summary = endorsement_agent.process_endorsements()
-        else:
-            endorsement_summary = ""
+    if linkedin_future is not None:
+        profile_summary, endorsement_summary = linkedin_future.result()
     else:
         profile_summary = ""
         endorsement_summary = ""
-        logger.info("LinkedIn processing bypassed")
+    background.shutdown()
 
     print("Endorsement Summary: ", endorsement_summary)
-    # report_path = generate_report_file(full_report_content, args.name, agency, "original", usaspending)
-
-    final_summary = review_and_improve_summary(
-        summary, args.name, agency, context)
 
     # Combine LinkedIn summaries
     linkedin_content = f"{profile_summary}\n\n{endorsement_summary}"
@@ -767,24 +1020,29 @@ def main():
     print(f"\n=== SALES CALL PREPARATION: {args.name} at {agency} ===\n")
     
     points = []
+    # Sets mirroring `points` (as-is and lowercased) for O(1) duplicate checks
+    seen_points = set()
+    seen_points_lower = set()
     for line in final_summary.split('\n'):
         line = line.strip()
         if not line:
             continue
 
         # Check if line is a numbered point or bullet point
-        if (line[0].isdigit() and '.' in line[:3]) or line[0] in ['•', '-', '*']:
+        bullet = _BULLET_RE.match(line)
+        if bullet:
             # Extract content without the numbering/bullet
-            if line[0].isdigit() and '.' in line[:3]:
-                content = line.split('.', 1)[1].strip()
-            else:
-                content = line[1:].strip()
+            content = bullet.group(1).strip()
 
             # Only add if not a duplicate
-            if content and content.lower() not in [p.lower() for p in points]:
+            if content and content.lower() not in seen_points_lower:
                 points.append(content)
-        elif line not in points:  # For non-bullet text
+                seen_points.add(content)
+                seen_points_lower.add(content.lower())
+        elif line not in seen_points:  # For non-bullet text
             points.append(line)
+            seen_points.add(line)
+            seen_points_lower.add(line.lower())
     # Generate final PDF with USASpending analysis
     # pdf_path = generate_report_file(final_summary, args.name, agency, "final", usaspending)
 
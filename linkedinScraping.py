@@ -3,6 +3,7 @@ import requests
 import random
 import time
 import os
+import urllib.parse
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -51,6 +52,9 @@ VIEWPORTS = [
 LANGUAGES = ["en-US", "en-GB", "fr-FR", "de-DE"]
 TIMEZONES = ["America/New_York", "Europe/London", "Asia/Tokyo"]
 
+# Only the HTML is saved, so these are aborted instead of downloaded through the proxy
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet"}
+
 OUTPUT_DIR = "linkedin_html_dumps"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -65,23 +69,63 @@ Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']});
 
 # ── HELPERS ──────────────────────────────────────────────────────────────────────
 
-def is_proxy_working(proxy_url: str, timeout: int = 10) -> bool:
-    """Quick HTTP check to weed out dead proxies."""
+# Proxy health results are reused for this long, and each proxy keeps one
+# session so repeat checks skip the TCP/TLS handshake
+PROXY_HEALTH_TTL = 5 * 60
+_proxy_health_cache: dict = {}
+_proxy_sessions: dict = {}
+
+def proxy_to_url(proxy: dict) -> str:
+    """Build a requests-style proxy URL from a Playwright proxy config."""
+    scheme, _, host = proxy["server"].partition("://")
+    if proxy.get("username"):
+        user = urllib.parse.quote(proxy["username"], safe="")
+        password = urllib.parse.quote(proxy.get("password", ""), safe="")
+        host = f"{user}:{password}@{host}"
+    return f"{scheme}://{host}"
+
+def is_proxy_working(proxy_url: str, timeout: int = 5) -> bool:
+    """Quick HTTP check to weed out dead proxies, cached for PROXY_HEALTH_TTL seconds."""
+    ok, checked_at = _proxy_health_cache.get(proxy_url, (False, 0.0))
+    if time.time() - checked_at < PROXY_HEALTH_TTL:
+        return ok
+
+    session = _proxy_sessions.get(proxy_url)
+    if session is None:
+        session = requests.Session()
+        session.proxies = {"http": proxy_url, "https": proxy_url}
+        _proxy_sessions[proxy_url] = session
+
+    # HEAD on a tiny static file proves the proxy works without downloading a page
     try:
-        r = requests.get(
-            "https://www.linkedin.com", 
-            proxies={"http": proxy_url, "https": proxy_url},
-            timeout=timeout
+        r = session.head(
+            "https://www.linkedin.com/robots.txt",
+            timeout=timeout,
+            allow_redirects=False
         )
-        return r.status_code == 200
+        ok = r.status_code == 200
     except Exception:
-        return False
+        ok = False
+    _proxy_health_cache[proxy_url] = (ok, time.time())
+    return ok
+
+def block_heavy_resources(route) -> None:
+    """Playwright route handler that skips resources the saved HTML doesn't need."""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
 
 # ── SCRAPER ──────────────────────────────────────────────────────────────────────
 
-def save_linkedin_page(url: str):
+def save_linkedin_page(url: str) -> str:
+    """Save the HTML of a LinkedIn page, returning the saved file's path.
+
+    Proxies are tried in random order and the first one that gets the page
+    wins; the remaining proxies are never used.
+    """
     # Prefilter live proxies
-    live_proxies = [p for p in PROXIES]
+    live_proxies = [p for p in PROXIES if is_proxy_working(proxy_to_url(p))]
     if not live_proxies:
         raise RuntimeError("No working proxies found!")
     random.shuffle(live_proxies)
@@ -113,6 +157,7 @@ def save_linkedin_page(url: str):
             )
             context.add_init_script(STEALTH_JS)
             page = context.new_page()
+            page.route("**/*", block_heavy_resources)
             page.set_default_navigation_timeout(60_000)  # 60s timeout
 
             # — LOGIN w/ retries & backoff —
@@ -139,8 +184,9 @@ def save_linkedin_page(url: str):
             # — FETCH TARGET w/ retry/backoff —
             for attempt in range(1, 4):
                 try:
-                    page.goto(url, wait_until="networkidle")
-                    time.sleep(random.uniform(3, 6))
+                    # The profile is in the DOM once <main> renders; no need to wait on XHR chatter
+                    page.goto(url, wait_until="domcontentloaded")
+                    page.wait_for_selector("main", timeout=10_000)
                     break
                 except Exception as e:
                     wait = 2 ** attempt
@@ -159,8 +205,11 @@ def save_linkedin_page(url: str):
             print(f"✅ Saved → {filename}")
 
             context.close()
+            browser.close()
+            return filename
 
         browser.close()
+        raise RuntimeError(f"Could not fetch {url} through any proxy")
 
 if __name__ == "__main__":
     target_url = "https://www.linkedin.com/in/steven-grunch-a2b0a55/"
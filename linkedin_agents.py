@@ -1,9 +1,39 @@
+import functools
 import os
+from typing import Dict
+
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from llm_cache import DiskCache
+
 load_dotenv()
 
+# Profile briefings keyed by the full LLM request (model, prompts and profile text),
+# so an edited profile or prompt is re-analyzed
+profile_cache = DiskCache("linkedin_profiles", ttl=7 * 24 * 60 * 60)
+
+PROFILE_SYSTEM_PROMPT = "You are a strategic sales assistant that analyzes LinkedIn profiles to generate actionable, hyper-specific insights. Your output is in Markdown format, structured to help a founder or seller prepare for a high-impact, personalized conversation. Focus on extracting unique hooks, relevant technologies, and sharp conversation starters based on the person's background. Avoid generic summaries."
+ENDORSEMENT_SYSTEM_PROMPT = "You are an expert at analyzing LinkedIn endorsement data. Share specific names, insights, and connections that might be useful to know before a sales call, as a concise summary."
+
+# Marks where the endorsement section starts in a combined answer. Not "---",
+# which the model also uses as an ordinary Markdown rule inside a section.
+SECTION_SEPARATOR = "=== ENDORSEMENTS ==="
+COMBINED_SYSTEM_PROMPT = (
+    "You answer two tasks in one reply. First, the profile briefing: " + PROFILE_SYSTEM_PROMPT
+    + " Then a line containing only " + SECTION_SEPARATOR + ", then the endorsement summary: "
+    + ENDORSEMENT_SYSTEM_PROMPT
+)
+
+# Endorsement text sent to the LLM is capped at this many characters
+MAX_ENDORSEMENT_CHARS = 16000
+
+@functools.lru_cache(maxsize=128)
+def _read_profile(path: str, mtime: float) -> str:
+    """Read a profile file; ``mtime`` is part of the cache key so edits are picked up."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
 class LinkedinProfileAgent:
     def __init__(self, profile_text_path: str, name: str = None, agency: str = None):
         self.profile_text_path = profile_text_path
@@ -12,25 +42,12 @@ class LinkedinProfileAgent:
         self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 
-    def process_profile(self) -> str:
-        try:
-            with open(self.profile_text_path, 'r', encoding='utf-8') as f:
-                profile_content = f.read()
-            
-            # Create context-aware prompt
-            context_info = ""
-            if self.name and self.agency:
-                context_info = f" for {self.name} from {self.agency}"
-            elif self.name:
-                context_info = f" for {self.name}"
-            
-            # prompt = f"""This is {self.name}'s LinkedIn Profile. We want to know hyper-specific, key knowledge that would help us design a sales approach.
-            # This should be immersive. Not a summary, but a commentary. However, organize it in a way that serves as a primer into the person and how we can approach them. This should be relatively short.
-            # ***Include a few key potential conversation starter questions based on {self.name}'s experience and interests.
-            # What technologies can we talk about? What experiences? What should we know about {self.name} that will give us a competitive advantage in the marketplace? Be HYPER SPECIFIC when suggesting an approach and do not generalize.
-            # \n\n{profile_content}"""
-            
-            prompt = f"""
+    def read_profile(self) -> str:
+        """Return the profile text, raising FileNotFoundError if it hasn't been extracted."""
+        return _read_profile(self.profile_text_path, os.path.getmtime(self.profile_text_path))
+
+    def build_prompt(self, profile_content: str) -> str:
+        return f"""
             This is {self.name}'s LinkedIn profile. Your task is to generate a **sales strategy briefing**.
 
             Don't summarize — analyze. Treat this like a high-stakes pre-call readout. Highlight insights that will **shape how we approach {self.name}** as a potential buyer, champion, or stakeholder. Focus on **hyper-specific hooks** — experiences, technologies, roles, or phrases that signal pain points, interests, or strategic priorities.
@@ -47,16 +64,37 @@ class LinkedinProfileAgent:
             {profile_content}
             """
 
-            response = self.client.chat.completions.create(
-                model="gpt-4o", # You can choose a different model if preferred
-                messages=[
-                    {"role": "system", "content": "You are a strategic sales assistant that analyzes LinkedIn profiles to generate actionable, hyper-specific insights. Your output is in Markdown format, structured to help a founder or seller prepare for a high-impact, personalized conversation. Focus on extracting unique hooks, relevant technologies, and sharp conversation starters based on the person's background. Avoid generic summaries."},
+    def process_profile(self) -> str:
+        try:
+            profile_content = self.read_profile()
+            
+            # prompt = f"""This is {self.name}'s LinkedIn Profile. We want to know hyper-specific, key knowledge that would help us design a sales approach.
+            # This should be immersive. Not a summary, but a commentary. However, organize it in a way that serves as a primer into the person and how we can approach them. This should be relatively short.
+            # ***Include a few key potential conversation starter questions based on {self.name}'s experience and interests.
+            # What technologies can we talk about? What experiences? What should we know about {self.name} that will give us a competitive advantage in the marketplace? Be HYPER SPECIFIC when suggesting an approach and do not generalize.
+            # \n\n{profile_content}"""
+            
+            prompt = self.build_prompt(profile_content)
+            request = {
+                "model": "gpt-4o", # You can choose a different model if preferred
+                "messages": [
+                    {"role": "system", "content": PROFILE_SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
-                max_tokens=1500
-            )
-            llm_summary = response.choices[0].message.content
+                "max_tokens": 1500
+            }
+
+            cache_key = DiskCache.make_key(request)
+            cached = profile_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            response = self.client.chat.completions.create(**request)
+            llm_summary = response.choices[0].message.content or ""
             
+            # An empty answer is returned but not cached, so the next run asks again
+            if llm_summary:
+                profile_cache.set(cache_key, f"{llm_summary}\n")
             return f"{llm_summary}\n"
         except FileNotFoundError:
             return f"### LinkedIn Profile Summary\n\nProfile file not found at {self.profile_text_path}\n"
@@ -68,62 +106,138 @@ class LinkedinEndorsementAgent:
         self.skills_file_paths = skills_file_paths
         self.name = name
         self.agency = agency
+        if name and agency:
+            self.context_info = f" for {name} from {agency}"
+        elif name:
+            self.context_info = f" for {name}"
+        else:
+            self.context_info = ""
         self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-    def process_endorsements(self) -> str:
-        all_endorsements = []
+    def _iter_endorsement_lines(self):
+        """Yield lines from every skills file, one file open at a time."""
         for file_path in self.skills_file_paths:
             try:
                 with open(file_path, 'r', encoding='utf-8') as f:
-                    all_endorsements.extend(f.readlines())
+                    yield from f
             except FileNotFoundError:
-                all_endorsements.append(f"File not found: {file_path}\n")
+                yield f"File not found: {file_path}\n"
             except Exception as e:
-                all_endorsements.append(f"Error reading {file_path}: {e}\n")
+                yield f"Error reading {file_path}: {e}\n"
+
+    def read_endorsements(self) -> str:
+        """Return the endorsement text, capped at MAX_ENDORSEMENT_CHARS characters."""
+        # Read until the character budget is reached; larger dumps would only crowd the context
+        all_endorsements = []
+        total_chars = 0
+        for line in self._iter_endorsement_lines():
+            all_endorsements.append(line)
+            total_chars += len(line)
+            if total_chars >= MAX_ENDORSEMENT_CHARS:
+                break
 
         # Combine all endorsement text
-        raw_endorsement_text = ''.join(all_endorsements)
-        
-        if not raw_endorsement_text.strip():
-            return "### LinkedIn Endorsements\n\nNo endorsement data found or processed.\n"
+        return ''.join(all_endorsements)[:MAX_ENDORSEMENT_CHARS]
 
-        # Use LLM to extract and analyze endorsement data
-        context_info = ""
-        if self.name and self.agency:
-            context_info = f" for {self.name} from {self.agency}"
-        elif self.name:
-            context_info = f" for {self.name}"
-            
-        extraction_prompt = f"""Please analyze the following LinkedIn endorsement text{context_info} and try to link {self.name} to his endorsers
+    def build_prompt(self, raw_endorsement_text: str) -> str:
+        return f"""Please analyze the following LinkedIn endorsement text{self.context_info} and try to link {self.name} to his endorsers
                     The information should contain key names including the most common endorsers, their company names.
                     We're trying to find broad information about {self.name}'s connections.
                     INCLUDE 5 SPECIFIC NAMES of endorsers and Company
+                    Then create a concise summary highlighting the most important insights for a sales call.
                     Raw endorsement text:
                     {raw_endorsement_text}
 
                     """
+
+    def process_endorsements(self) -> str:
+        raw_endorsement_text = self.read_endorsements()
         
-        extraction_response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an expert at analyzing LinkedIn endorsement data. Share specific names, insights, and connections that might be useful to know before a sales call."},
-                {"role": "user", "content": extraction_prompt}
-            ],
-            max_tokens=1500
-        )
-        
-        structured_analysis = extraction_response.choices[0].message.content
-        
-        prompt = f"Based on the following structured endorsement analysis, create a concise summary highlighting the most important insights for a sales call:\n\n{structured_analysis}"
+        if not raw_endorsement_text.strip():
+            return "### LinkedIn Endorsements\n\nNo endorsement data found or processed.\n"
+
+        # Use LLM to extract and analyze endorsement data
+        prompt = self.build_prompt(raw_endorsement_text)
 
+        # One call both extracts the endorsers and summarizes them for the sales call
         response = self.client.chat.completions.create(
             model="gpt-4o", # You can choose a different model if preferred
             messages=[
-                {"role": "system", "content": "You are a helpful assistant that summarizes LinkedIn endorsement data."},
+                {"role": "system", "content": ENDORSEMENT_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=1500
         )
         llm_summary = response.choices[0].message.content
 
-        return f"{llm_summary}\n"
\ No newline at end of file
+        return f"{llm_summary}\n"
+
+class LinkedinCombinedAgent:
+    """Produces the profile briefing and the endorsement summary in one LLM call.
+
+    Falls back to the separate agents when either input is missing, so the
+    output matches what they would return on their own.
+    """
+
+    def __init__(self, profile_text_path: str, skills_file_paths: list, name: str = None,
+                 agency: str = None):
+        self.profile_agent = LinkedinProfileAgent(profile_text_path, name, agency)
+        self.endorsement_agent = LinkedinEndorsementAgent(skills_file_paths, name, agency)
+        self.name = name
+        self.agency = agency
+        self.client = self.profile_agent.client
+
+    def process(self) -> Dict[str, str]:
+        try:
+            profile_content = self.profile_agent.read_profile()
+        except FileNotFoundError:
+            profile_content = None
+        raw_endorsement_text = self.endorsement_agent.read_endorsements()
+        if profile_content is None or not raw_endorsement_text.strip():
+            return {
+                "profile": self.profile_agent.process_profile(),
+                "endorsements": self.endorsement_agent.process_endorsements(),
+            }
+
+        prompt = (
+            self.profile_agent.build_prompt(profile_content)
+            + "\n\n"
+            + self.endorsement_agent.build_prompt(raw_endorsement_text)
+        )
+        request = {
+            "model": "gpt-4o",
+            "messages": [
+                {"role": "system", "content": COMBINED_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": 2500
+        }
+
+        cache_key = DiskCache.make_key(request)
+        cached = profile_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            response = self.client.chat.completions.create(**request)
+        except Exception as e:
+            return {
+                "profile": f"### LinkedIn Profile Summary\n\nError processing profile: {e}\n",
+                "endorsements": "",
+            }
+
+        content = response.choices[0].message.content or ""
+        profile_summary, separator, endorsement_summary = content.partition(SECTION_SEPARATOR)
+        if not separator:
+            # The reply could not be split into its two sections; don't cache it and
+            # summarize the profile and endorsements separately instead
+            return {
+                "profile": self.profile_agent.process_profile(),
+                "endorsements": self.endorsement_agent.process_endorsements(),
+            }
+        result = {
+            "profile": f"{profile_summary.strip()}\n",
+            "endorsements": f"{endorsement_summary.strip()}\n",
+        }
+        profile_cache.set(cache_key, result)
+        return result
@@ -1,7 +1,31 @@
-from bs4 import BeautifulSoup
 import os
-import glob
 import re
+from concurrent.futures import ProcessPoolExecutor
+
+import lxml.html
+from lxml import etree
+
+from llm_cache import DiskCache
+
+# Output path of each extracted dump. Several dumps can write the same output
+# (e.g. Profile.txt), so an entry is only reused while that file is untouched.
+extract_cache = DiskCache("linkedin_extracts", ttl=30 * 24 * 60 * 60)
+
+# JSON blocks left in the page text. Scripts are removed from the tree before
+# the text is taken, but LinkedIn also embeds its page data as JSON in hidden
+# <code> elements. Matching only brace-free blocks keeps every scan linear; nested
+# blocks are removed innermost first by repeating the pass.
+_RE_JSON = re.compile(r"\{[^{}]*\}")
+# Pipes are deleted with str.translate, which is far cheaper than a regex pass
+_PIPE_TRANS = str.maketrans("", "", "|")
+_RE_WS = re.compile(r"\s{2,}")
+# Line boundaries str.splitlines() splits on, other than "\n" itself
+_LINE_BREAK_TRANS = str.maketrans(dict.fromkeys("\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029", "\n"))
+# Page number in a Skills dump's filename, e.g. "Skills-2"
+_RE_SKILLS = re.compile(r'Skills.*?-?(\d+)')
+# Nodes whose text is not page content. Dropping them from the tree is what keeps
+# JavaScript and CSS out of the extracted text.
+NON_TEXT_NODES = ("script", "style", "noscript", "iframe", "svg", "template", etree.Comment)
 
 def clean_extracted_text(raw_text):
     """
@@ -13,41 +37,33 @@ def clean_extracted_text(raw_text):
     Returns:
         str: Cleaned text
     """
-    cleaned_text = raw_text
-    
-    # Remove JSON blocks
-    cleaned_text = re.sub(r"{.*?}", "", cleaned_text, flags=re.DOTALL)
-    
-    # Remove repeated pipes
-    cleaned_text = re.sub(r"\|+", "", cleaned_text)
-    
-    # Remove JavaScript functions
-    cleaned_text = re.sub(r"\bfunction\b.*?{.*?}", "", cleaned_text, flags=re.DOTALL)
-    
-    # Remove inline JS like document.write;
-    cleaned_text = re.sub(r"document\..*?;", "", cleaned_text)
-    
-    # Remove other common web artifacts
-    cleaned_text = re.sub(r"window\.[^\s]*", "", cleaned_text)  # window.* calls
-    cleaned_text = re.sub(r"var\s+[^=]*=.*?;", "", cleaned_text)  # variable declarations
-    cleaned_text = re.sub(r"\bif\s*\([^)]*\)\s*{[^}]*}", "", cleaned_text)  # simple if statements
+    # Remove JSON blocks, then pipes
+    cleaned_text, removed = _RE_JSON.subn("", raw_text)
+    while removed:
+        cleaned_text, removed = _RE_JSON.subn("", cleaned_text)
+    cleaned_text = cleaned_text.translate(_PIPE_TRANS)
     
     # Reduce long whitespace to single newline
-    cleaned_text = re.sub(r"\s{2,}", "\n", cleaned_text)
+    cleaned_text = _RE_WS.sub("\n", cleaned_text)
     
-    # Normalize newlines (max 2 consecutive)
-    cleaned_text = re.sub(r"\n{2,}", "\n\n", cleaned_text)
-    
-    # Remove leading/trailing whitespace from each line
-    lines = [line.strip() for line in cleaned_text.splitlines()]
-    
-    # Remove empty lines at the beginning and end
-    while lines and not lines[0]:
-        lines.pop(0)
-    while lines and not lines[-1]:
-        lines.pop()
+    # What whitespace is left is single characters between words. Turning the
+    # line separators splitlines() recognizes into "\n" and trimming both ends
+    # strips every line and drops blank lines at the beginning and end
+    return cleaned_text.translate(_LINE_BREAK_TRANS).strip()
+
+def _output_filename(html_file_path):
+    """Name of the text file a dump is saved to, which depends only on its filename."""
+    base_name = os.path.splitext(os.path.basename(html_file_path))[0]
     
-    return "\n".join(lines)
+    # Determine if this is a Skills page or Profile page
+    if "Skills" in base_name:
+        # Extract number from Skills page filename
+        match = _RE_SKILLS.search(base_name)
+        if match:
+            number = match.group(1)
+            return f"skills-{number}.txt"
+        return "skills.txt"
+    return "Profile.txt"
 
 def extract_linkedin_text(html_file_path, output_dir="extracted_text"):
     """
@@ -63,68 +79,93 @@ def extract_linkedin_text(html_file_path, output_dir="extracted_text"):
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
-    # Load the HTML content from the file
-    with open(html_file_path, "r", encoding="utf-8") as file:
-        html_content = file.read()
+    # lxml reads the file in chunks as it parses, so the whole dump is never held
+    # as one bytes object. Saved LinkedIn pages are UTF-8; stating it stops lxml
+    # from guessing from the bytes.
+    with open(html_file_path, "rb") as file:
+        tree = lxml.html.parse(file, parser=lxml.html.HTMLParser(encoding="utf-8")).getroot()
+    if tree is None:
+        raise etree.ParserError("Document is empty")
     
-    # Use BeautifulSoup to strip all HTML tags and get only text
-    soup = BeautifulSoup(html_content, "html.parser")
-    raw_text = soup.get_text(separator="\n")
+    # Only the flat text is needed, so take it straight from the lxml tree
+    etree.strip_elements(tree, *NON_TEXT_NODES, with_tail=False)
+    # Whitespace-only nodes (indentation between tags) would only add runs that
+    # clean_extracted_text collapses again, so they are dropped here
+    raw_text = "\n".join(text for text in tree.itertext() if text and not text.isspace())
     
     # Clean the extracted text
     cleaned_text = clean_extracted_text(raw_text)
     
-    # Generate output filename based on input filename and content type
-    base_name = os.path.splitext(os.path.basename(html_file_path))[0]
+    output_filename = _output_filename(html_file_path)
     
-    # Determine if this is a Skills page or Profile page
-    if "Skills" in base_name:
-        # Extract number from Skills page filename
-        import re
-        match = re.search(r'Skills.*?-?(\d+)', base_name)
-        if match:
-            number = match.group(1)
-            output_filename = f"skills-{number}.txt"
-        else:
-            output_filename = "skills.txt"
-    else:
-        output_filename = "Profile.txt"
-    
-    # Extract only the content between the two lines containing "Status is"
-    lines = cleaned_text.splitlines()
+    # Extract only the content between the two lines containing "Status is", or
+    # up to "More profiles for you" if that comes first. str.find scans in C, and
+    # line numbers are only counted up to the markers.
     start_index = None
     end_index = None
-    
-    for i, line in enumerate(lines):
-        if "Status is" in line:
-            if start_index is None:
-                start_index = i
-            elif end_index is None:
-                end_index = i
-                break
-        if end_index is None:
-            if "More profiles for you" in line:
-                end_index = i
-                break
+    start = cleaned_text.find("Status is")
+    if start >= 0:
+        start_line_end = cleaned_text.find("\n", start)
+        second = cleaned_text.find("Status is", start_line_end) if start_line_end >= 0 else -1
+        more = cleaned_text.find("More profiles for you")
+        ends = [i for i in (second, more) if i >= 0]
+        if ends:
+            end = min(ends)
+            start_index = cleaned_text.count("\n", 0, start)
+            end_index = cleaned_text.count("\n", 0, end)
     
     # Extract and save the relevant portion if both markers are found
     output_path = os.path.join(output_dir, output_filename)
     
     if start_index is not None and end_index is not None and start_index < end_index:
-        sliced_text = "\n".join(lines[start_index:end_index + 1])
+        slice_end = cleaned_text.find("\n", end)
+        sliced_text = cleaned_text[cleaned_text.rfind("\n", 0, start) + 1:
+                                   slice_end if slice_end >= 0 else len(cleaned_text)]
         status_message = f"Found content between 'Status is' markers (lines {start_index+1} to {end_index+1})"
     else:
         sliced_text = "Could not find two 'Status is' markers in the text."
         status_message = "No valid 'Status is' markers found"
     
-    # Save the sliced content
-    with open(output_path, "w", encoding="utf-8") as file:
+    # Save the sliced content to a temporary file and rename it into place, so a
+    # reader never sees a partial slice. Each process gets its own temporary file,
+    # since several dumps can write the same output.
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as file:
         file.write(sliced_text)
+    os.replace(tmp_path, output_path)
     
     print(f"✅ Status slice saved to: {output_path} - {status_message}")
     
     return output_path
 
+def _extract_group_in_worker(html_file_paths, output_dir):
+    """Run extract_linkedin_text in a pool process over dumps sharing one output file.
+
+    The dumps are extracted one after another in the given order, so the last
+    one's slice is what the file ends up holding. Returns an (output path,
+    error message) pair per dump; errors are passed back as text because some
+    lxml exceptions carry an error log that cannot be pickled to the parent.
+    """
+    results = []
+    for html_file_path in html_file_paths:
+        try:
+            results.append((extract_linkedin_text(html_file_path, output_dir), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
+def _extract_cache_key(html_file_path, output_dir, stat):
+    """Key an extraction by the source file's identity, size and modification time."""
+    return DiskCache.make_key(os.path.abspath(html_file_path), os.path.abspath(output_dir),
+                              stat.st_mtime_ns, stat.st_size)
+
+def _output_mtime(path):
+    """Modification time of an extracted file, or None if it no longer exists."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
 def process_all_linkedin_files(input_dir="linkedin_html_dumps", output_dir="extracted_text"):
     """
     Process all LinkedIn HTML files in the specified directory.
@@ -133,7 +174,18 @@ def process_all_linkedin_files(input_dir="linkedin_html_dumps", output_dir="extr
         input_dir (str): Directory containing LinkedIn HTML files
         output_dir (str): Directory to save extracted text files
     """
-    html_files = glob.glob(os.path.join(input_dir, "*.html"))
+    # scandir's entries carry the stat data the extraction cache keys on
+    try:
+        with os.scandir(input_dir) as entries:
+            html_stats = {
+                entry.path: entry.stat()
+                for entry in entries
+                if entry.name.endswith(".html") and not entry.name.startswith(".")
+                and entry.is_file()
+            }
+    except FileNotFoundError:
+        html_stats = {}
+    html_files = list(html_stats)
     
     if not html_files:
         print(f"❌ No HTML files found in {input_dir}")
@@ -141,17 +193,54 @@ def process_all_linkedin_files(input_dir="linkedin_html_dumps", output_dir="extr
     
     print(f"📁 Found {len(html_files)} HTML files to process:")
     
-    results = []
+    # Dumps writing the same output (e.g. Profile.txt) are kept together in file order,
+    # so the last one still wins as when they were processed one by one
+    groups = {}
     for html_file in html_files:
-        print(f"\n🔄 Processing: {os.path.basename(html_file)}")
-        try:
-            slice_path = extract_linkedin_text(html_file, output_dir)
-            results.append({
-                'source': html_file,
-                'status_slice': slice_path
-            })
-        except Exception as e:
-            print(f"❌ Error processing {html_file}: {str(e)}")
+        groups.setdefault(_output_filename(html_file), []).append(html_file)
+
+    # Groups whose sources and output are untouched since the last run are not
+    # re-extracted; if any dump in a group changed, the whole group runs again
+    slice_paths = {}
+    pending = []
+    for group in groups.values():
+        cached = [extract_cache.get(_extract_cache_key(html_file, output_dir, html_stats[html_file]))
+                  for html_file in group]
+        if all(entry is not None and _output_mtime(entry["out"]) == entry["out_mtime"]
+               for entry in cached):
+            for html_file, entry in zip(group, cached):
+                print(f"\n⏭️  Unchanged, reusing: {entry['out']}")
+                slice_paths[html_file] = entry["out"]
+        else:
+            pending.append(group)
+
+    # Groups are independent and parsing/cleaning is CPU-bound, so each one gets its own process
+    if pending:
+        with ProcessPoolExecutor(max_workers=min(len(pending), os.cpu_count() or 1)) as executor:
+            futures = []
+            for group in pending:
+                for html_file in group:
+                    print(f"\n🔄 Processing: {os.path.basename(html_file)}")
+                futures.append((group, executor.submit(_extract_group_in_worker, group, output_dir)))
+
+            for group, future in futures:
+                try:
+                    group_results = future.result()
+                except Exception as e:
+                    group_results = [(None, str(e))] * len(group)
+                for html_file, (slice_path, error) in zip(group, group_results):
+                    if error is not None:
+                        print(f"❌ Error processing {html_file}: {error}")
+                        continue
+                    slice_paths[html_file] = slice_path
+                    extract_cache.set(_extract_cache_key(html_file, output_dir, html_stats[html_file]),
+                                      {"out": slice_path, "out_mtime": _output_mtime(slice_path)})
+
+    # Listed in file order, whether extracted now or reused
+    results = [
+        {'source': html_file, 'status_slice': slice_paths[html_file]}
+        for html_file in html_files if html_file in slice_paths
+    ]
     
     print(f"\n✅ Processing complete! Processed {len(results)} files successfully.")
     return results
@@ -0,0 +1,308 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import orjson
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = "llm_cache.sqlite"
+EMBEDDING_MODEL = "text-embedding-3-small"
+# Prompts are truncated before embedding to stay well inside the model's input limit
+MAX_EMBED_CHARS = 20000
+# Embedding requests arriving within this window share one API call, up to the batch size
+EMBED_BATCH_WINDOW = 0.02
+EMBED_BATCH_SIZE = 64
+
+
+class DiskCache:
+    """Key/value cache of JSON-serializable values in SQLite, with expiry.
+
+    Values read or written in this process are also kept in memory, so repeat
+    hits skip both the database and the JSON decode.
+    """
+
+    def __init__(self, namespace: str, ttl: int, path: str = CACHE_PATH):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.path = path
+        self.stats = {"hits": 0, "misses": 0}
+        self._memory: Dict[str, tuple] = {}
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                       namespace TEXT NOT NULL,
+                       key TEXT NOT NULL,
+                       value TEXT NOT NULL,
+                       created REAL NOT NULL,
+                       PRIMARY KEY (namespace, key)
+                   )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a stable key from JSON-serializable parts such as a request payload."""
+        payload = orjson.dumps(parts, default=str, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key``, or None if it is missing or expired."""
+        cutoff = time.time() - self.ttl
+        entry = self._memory.get(key)
+        if entry is None:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT value, created FROM entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+            if row:
+                entry = (orjson.loads(row[0]), row[1])
+                self._memory[key] = entry
+
+        if entry is None or entry[1] < cutoff:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return entry[0]
+
+    def set(self, key: str, value: Any) -> None:
+        created = time.time()
+        self._memory[key] = (value, created)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (self.namespace, key, orjson.dumps(value).decode(), created),
+            )
+
+
+@dataclass
+class _PendingEmbedding:
+    text: str
+    done: threading.Event = field(default_factory=threading.Event)
+    vector: Optional[np.ndarray] = None
+    error: Optional[Exception] = None
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent embedding requests into batched API calls.
+
+    The first caller to arrive waits ``window`` seconds (or until ``max_batch``
+    requests are queued) and then embeds everything queued so far, so N
+    concurrent lookups cost ceil(N / max_batch) round trips instead of N.
+    """
+
+    def __init__(self, client, model: str = EMBEDDING_MODEL, window: float = EMBED_BATCH_WINDOW,
+                 max_batch: int = EMBED_BATCH_SIZE):
+        self.client = client
+        self.model = model
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._batch_full = threading.Event()
+        self._pending: List[_PendingEmbedding] = []
+
+    def embed(self, text: str) -> np.ndarray:
+        """Return the unit-length embedding of ``text``, raising if the API call fails."""
+        item = _PendingEmbedding(text)
+        with self._lock:
+            self._pending.append(item)
+            is_leader = len(self._pending) == 1
+            if len(self._pending) >= self.max_batch:
+                self._batch_full.set()
+
+        if is_leader:
+            self._batch_full.wait(self.window)
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._batch_full.clear()
+            self._flush(batch)
+
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.vector
+
+    def _flush(self, batch: List[_PendingEmbedding]) -> None:
+        for start in range(0, len(batch), self.max_batch):
+            chunk = batch[start:start + self.max_batch]
+            try:
+                response = self.client.embeddings.create(
+                    model=self.model, input=[item.text for item in chunk])
+                for item, data in zip(chunk, sorted(response.data, key=lambda d: d.index)):
+                    vector = np.asarray(data.embedding, dtype=np.float32)
+                    item.vector = vector / np.linalg.norm(vector)
+            except Exception as exc:
+                for item in chunk:
+                    item.error = exc
+            finally:
+                for item in chunk:
+                    item.done.set()
+
+
+class SemanticCache:
+    """Cache of chat completions backed by SQLite.
+
+    Lookups first try an exact key over the model and the full request, then
+    fall back to cosine similarity between prompt embeddings. Similarity matches
+    are only considered between entries with the same model and scope, so
+    callers can keep e.g. different people or agencies from answering for each
+    other.
+    """
+
+    def __init__(self, client, path: str = CACHE_PATH, threshold: float = 0.92,
+                 ttl: int = 24 * 60 * 60):
+        self.client = client
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self._embedder = EmbeddingBatcher(client)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS completions (
+                       key TEXT PRIMARY KEY,
+                       model TEXT NOT NULL,
+                       scope TEXT NOT NULL,
+                       embedding BLOB,
+                       response TEXT NOT NULL,
+                       created REAL NOT NULL
+                   )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per operation keeps the cache safe to use from worker threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _exact_key(model: str, payload: Any) -> str:
+        # Any change to the request (instructions, max_tokens, ...) must miss the exact tier
+        return DiskCache.make_key(model, payload)
+
+    def _embed(self, prompt: str) -> Optional[np.ndarray]:
+        """Embed a prompt as a unit-length float32 vector, or None if embedding fails."""
+        try:
+            return self._embedder.embed(prompt[:MAX_EMBED_CHARS])
+        except Exception as exc:
+            logger.warning("Embedding request failed, using exact-match cache only: %s", exc)
+            return None
+
+    def _lookup_exact(self, key: str) -> Optional[str]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT response FROM completions WHERE key = ? AND created >= ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _lookup_similar(self, model: str, scope: str, embedding: np.ndarray) -> Optional[str]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT embedding, response FROM completions "
+                "WHERE model = ? AND scope = ? AND embedding IS NOT NULL AND created >= ?",
+                (model, scope, time.time() - self.ttl),
+            ).fetchall()
+        if not rows:
+            return None
+
+        # Stored vectors are unit length, so one matrix-vector product gives every cosine
+        cached = np.stack([np.frombuffer(blob, dtype=np.float32) for blob, _ in rows])
+        similarities = cached @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            logger.info("Semantic cache hit (similarity %.3f)", similarities[best])
+            return rows[best][1]
+        return None
+
+    def _store(self, key: str, model: str, scope: str, embedding: Optional[np.ndarray],
+               response: str) -> None:
+        blob = embedding.tobytes() if embedding is not None else None
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, scope, blob, response, time.time()),
+            )
+
+    def _lookup(self, model: str, prompt: str, scope: str, payload: Any,
+                similar: bool = True) -> tuple:
+        """Return (exact key, prompt embedding, cached response or None) for a request."""
+        key = self._exact_key(model, payload)
+        embedding = None
+        cached = self._lookup_exact(key)
+        if cached is not None:
+            logger.info("Exact cache hit for %s completion", model)
+        elif similar:
+            embedding = self._embed(prompt)
+            if embedding is not None:
+                cached = self._lookup_similar(model, scope, embedding)
+        return key, embedding, cached
+
+    def get_or_create(self, model: str, prompt: str, request: Callable[[], str],
+                      payload: Any, scope: str = "", similar: bool = True) -> str:
+        """Return the cached answer for ``prompt``, or call ``request`` and cache its result.
+
+        Used for providers other than the OpenAI client. ``prompt`` is the text
+        matched against earlier entries, so callers can pass just the part of
+        the request that varies (e.g. the search query) rather than the full
+        messages, whose shared boilerplate would make every prompt look alike.
+        ``payload`` is the full request ``request`` sends, and only an identical
+        payload matches exactly.
+        Pass ``similar=False`` for prompts that should only ever match exactly,
+        such as ones embedding a document whose small edits matter.
+        """
+        key, embedding, cached = self._lookup(model, prompt, scope, payload, similar)
+        if cached is not None:
+            return cached
+
+        content = request()
+        if content:
+            self._store(key, model, scope, embedding, content)
+        return content
+
+    def complete(self, model: str, messages: List[Dict[str, str]], scope: str = "",
+                 on_delta: Optional[Callable[[str], None]] = None, similar: bool = True,
+                 **kwargs) -> str:
+        """Return the content of a chat completion, serving it from the cache when possible.
+
+        Args:
+            model: Chat model name
+            messages: Chat messages, as passed to ``chat.completions.create``
+            scope: Optional key restricting which entries may match by similarity
+            on_delta: Optional callback that receives the completion text as it
+                streams in (a cached answer is passed in one piece)
+            similar: Whether an embedding-similar earlier prompt may answer this one
+            **kwargs: Extra arguments for ``chat.completions.create``
+
+        Returns:
+            The completion's message content
+        """
+        prompt = "\n\n".join(message["content"] for message in messages)
+        key, embedding, cached = self._lookup(model, prompt, scope, [messages, kwargs], similar)
+        if cached is not None:
+            if on_delta:
+                on_delta(cached)
+            return cached
+
+        if on_delta:
+            stream = self.client.chat.completions.create(
+                model=model, messages=messages, stream=True, **kwargs)
+            pieces = []
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    pieces.append(delta)
+                    on_delta(delta)
+            content = "".join(pieces)
+        else:
+            response = self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+            content = response.choices[0].message.content
+        if content:
+            self._store(key, model, scope, embedding, content)
+        return content
@@ -1,14 +1,27 @@
 import requests
 import logging
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+# One pooled session for every page, retried on rate limits and server errors
 session = requests.Session()
+session.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]),
+))
 logger = logging.getLogger(__name__)
 SAM_BASE = "https://api.sam.gov/prod/opportunities/v2/search"
+# Pages of solicitations pulled per search, and how many of them may be in flight at once
+MAX_PAGES = 5
+MAX_CONCURRENT_PAGES = 8
 load_dotenv()
 samgov_api_key = os.getenv("SAMGOV_API_KEY")
 print(samgov_api_key)
@@ -21,7 +34,6 @@ def fetch_hhs_oig_solicitations(status: str="active"):
     status: "active" or "archived"
     Returns a list of solicitations for HHS → OIG.
     """
-    page = 1
     perpage = 10
 
     payload = {
@@ -34,13 +46,27 @@ def fetch_hhs_oig_solicitations(status: str="active"):
         # "postedTo": (datetime.now() - timedelta(days=0)).strftime("%Y-%m-%d"),         # Current date
         "postedFrom": "01/01/2024",     # Filter for recent solicitations
         "postedTo": "12/31/2024",       # Current date
-        "page":   page,
         "limit":  perpage
     }
-    resp = requests.get(SAM_BASE, params=payload)
-    print(f"GET Request URL: {resp.request.url}")
-    resp.raise_for_status()
-    return resp.json()
+
+    def fetch_page(page: int) -> dict:
+        # SAM.gov's offset is the page index
+        resp = session.get(SAM_BASE, params={**payload, "offset": page}, timeout=30)
+        print(f"GET Request URL: {resp.request.url}")
+        resp.raise_for_status()
+        # orjson parses the raw bytes directly, skipping requests' text decode
+        return orjson.loads(resp.content)
+
+    # The first page reports the total, then the remaining pages are requested concurrently
+    first_page = fetch_page(0)
+    total_records = first_page.get("totalRecords", 0)
+    page_count = min(MAX_PAGES, -(-total_records // perpage))
+    if page_count > 1:
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_PAGES, page_count - 1)) as executor:
+            for page_data in executor.map(fetch_page, range(1, page_count)):
+                first_page.setdefault("opportunitiesData", []).extend(
+                    page_data.get("opportunitiesData", []))
+    return first_page
 
 active_ops = fetch_hhs_oig_solicitations("active")
 # archived_ops = fetch_hhs_oig_solicitations("archived")